@@ -1,10 +1,51 @@
 from __future__ import annotations
 
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
-from typing import Any, FrozenSet, Generator, List, Optional, Set
+from enum import Enum
+from functools import lru_cache
+import hashlib
+from itertools import combinations, product
+from math import comb
+import os
+from pathlib import Path
+import sys
+import time
+from typing import (
+    Any,
+    Callable,
+    ClassVar,
+    Dict,
+    FrozenSet,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore[assignment]  # NumPy is optional; callers check.
 
 NUMBER_OF_FINGERS_TO_CONSIDER = 4
 MAXIMUM_SPAN_OF_FRETS = 3
+NUMBER_OF_SCALE_DEGREES = 12
+ALL_SCALE_DEGREES_MASK = (1 << NUMBER_OF_SCALE_DEGREES) - 1
+BITS_PER_STRING_IN_CODE = 5
+FRET_CODE_MASK = (1 << BITS_PER_STRING_IN_CODE) - 1
+NUMBER_OF_PITCHES_TO_INTERN = 128
+NUMPY_BLOCK_SIZE_IN_PAIRS = 1 << 16
+DEFAULT_PROGRESS_INTERVAL_IN_SECONDS = 1.0
+HAND_POSITION_CACHE_FORMAT_VERSION = 1
+DEFAULT_HAND_POSITION_CACHE_DIRECTORY = Path(".guitars-cache")
+DEFAULT_MAXIMUM_HAND_POSITION_CACHE_SIZE_IN_BYTES = 64 * 1024 * 1024
 
 
 @dataclass(frozen=True)
@@ -24,12 +65,27 @@ class Note:
         11: "B",
     }
 
+    _INSTANCES: ClassVar[Dict[Tuple[int, int], Note]] = {}
+
     pitch: int
     scale_degree: int
 
+    def __new__(cls, pitch: int, scale_degree: int) -> Note:
+        note = cls._INSTANCES.get((pitch, scale_degree))
+        if note is None:
+            note = super().__new__(cls)
+            cls._INSTANCES[(pitch, scale_degree)] = note
+        return note
+
+    def __getnewargs__(self) -> Tuple[int, int]:
+        return (self.pitch, self.scale_degree)
+
     @classmethod
     def from_pitch(cls, pitch: int) -> Note:
-        return Note(pitch, pitch % 12)
+        note = cls._INSTANCES.get((pitch, pitch % 12))
+        if note is None:
+            note = Note(pitch, pitch % 12)
+        return note
 
     @property
     def name(self) -> str:
@@ -38,6 +94,16 @@ class Note:
     def transpose_upwards_by(self, semitones: int) -> Note:
         return Note.from_pitch(self.pitch + semitones)
 
+    def __eq__(self, other: Any) -> bool:
+        if self is other:
+            return True
+        if not isinstance(other, Note):
+            return NotImplemented
+        return (self.pitch, self.scale_degree) == (other.pitch, other.scale_degree)
+
+    def __hash__(self) -> int:
+        return hash((self.pitch, self.scale_degree))
+
     def __lt__(self, other: Note) -> bool:
         if not isinstance(other, Note):
             return NotImplemented
@@ -57,8 +123,30 @@ class String:
         5: Note.from_pitch(9),
         6: Note.from_pitch(4),
     }
+    _INSTANCES: ClassVar[Dict[int, String]] = {}
+
     number: int
 
+    def __new__(cls, number: int) -> String:
+        string = cls._INSTANCES.get(number)
+        if string is None:
+            string = super().__new__(cls)
+            cls._INSTANCES[number] = string
+        return string
+
+    def __getnewargs__(self) -> Tuple[int]:
+        return (self.number,)
+
+    def __eq__(self, other: Any) -> bool:
+        if self is other:
+            return True
+        if not isinstance(other, String):
+            return NotImplemented
+        return self.number == other.number
+
+    def __hash__(self) -> int:
+        return hash(self.number)
+
     @property
     def _open_string_note(self) -> Note:
         return self.STRING_NUMBER_TO_NOTE[self.number]
@@ -75,21 +163,53 @@ class String:
 
 @dataclass(frozen=True)
 class Fret:
-    ROMAN_NUMERALS = {
-        1: "I",
-        2: "II",
-        3: "III",
-        4: "IV",
-        5: "V",
-        6: "VI",
-        7: "VII",
-        8: "VIII",
-    }
+    ROMAN_NUMERALS = (
+        (1000, "M"),
+        (900, "CM"),
+        (500, "D"),
+        (400, "CD"),
+        (100, "C"),
+        (90, "XC"),
+        (50, "L"),
+        (40, "XL"),
+        (10, "X"),
+        (9, "IX"),
+        (5, "V"),
+        (4, "IV"),
+        (1, "I"),
+    )
+    _INSTANCES: ClassVar[Dict[int, Fret]] = {}
 
     number: int
 
+    def __new__(cls, number: int) -> Fret:
+        fret = cls._INSTANCES.get(number)
+        if fret is None:
+            fret = super().__new__(cls)
+            cls._INSTANCES[number] = fret
+        return fret
+
+    def __getnewargs__(self) -> Tuple[int]:
+        return (self.number,)
+
+    def __eq__(self, other: Any) -> bool:
+        if self is other:
+            return True
+        if not isinstance(other, Fret):
+            return NotImplemented
+        return self.number == other.number
+
+    def __hash__(self) -> int:
+        return hash(self.number)
+
     def __repr__(self) -> str:
-        return self.ROMAN_NUMERALS[self.number + 1]
+        # Frets are numbered from 0 but shown from I, however far up they go.
+        remainder = self.number + 1
+        numeral = ""
+        for value, symbol in self.ROMAN_NUMERALS:
+            count, remainder = divmod(remainder, value)
+            numeral += symbol * count
+        return numeral
 
     def __lt__(self, other: Fret) -> bool:
         if not isinstance(other, Fret):
@@ -106,41 +226,110 @@ class Placement:
         return f"{self.string} - {self.fret}"
 
 
-@dataclass(frozen=True)
 class HandPosition:
-    placements: FrozenSet[Placement]
+    # The fret on each of Guitar.STRINGS is packed into its own
+    # BITS_PER_STRING_IN_CODE bits of a single code, as one more than the fret
+    # number, with 0 for an open string. The placements are derived from it.
+    # Everything the filters and the pair search need is worked out from the
+    # code once, and kept in slots as plain integers. _is_valid stays None
+    # until then, and the other slots are only set for valid hand-positions.
+    __slots__ = (
+        "code",
+        "_is_valid",
+        "_has_some_overlapping_of_notes",
+        "_scale_degree_mask",
+        "_open_string_mask",
+        "_lowest_pitch",
+        "_highest_pitch",
+        "_frets",
+    )
+
+    code: int
+    _is_valid: Optional[bool]
+    _has_some_overlapping_of_notes: bool
+    _scale_degree_mask: int
+    _open_string_mask: int
+    _lowest_pitch: int
+    _highest_pitch: int
+    _frets: Optional[FrozenSet[Fret]]
+
+    def __init__(self, placements: Iterable[Placement] = frozenset()) -> None:
+        code = 0
+        for placement in placements:
+            shift = get_string_index(placement.string) * BITS_PER_STRING_IN_CODE
+            if (code >> shift) & FRET_CODE_MASK:
+                raise Exception("A hand-position can't touch a string twice.")
+            if placement.fret.number + 1 > FRET_CODE_MASK:
+                raise Exception(
+                    f"Fret {placement.fret.number} is too high up to be encoded."
+                )
+            code |= (placement.fret.number + 1) << shift
+        self._set_code(code)
+
+    def _set_code(self, code: int) -> None:
+        object.__setattr__(self, "code", code)
+        object.__setattr__(self, "_is_valid", None)
+        object.__setattr__(self, "_frets", None)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("Hand-positions can't be changed.")
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, HandPosition):
+            return NotImplemented
+        return self.code == other.code
+
+    def __hash__(self) -> int:
+        return hash(self.code)
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return (HandPosition.from_code, (self.code,))
+
+    @property
+    def placements(self) -> FrozenSet[Placement]:
+        return frozenset(self)
+
+    def _get_fret_codes(self) -> List[int]:
+        return [
+            (self.code >> (index * BITS_PER_STRING_IN_CODE)) & FRET_CODE_MASK
+            for index in range(len(Guitar.STRINGS))
+        ]
 
     def is_valid(self) -> bool:
-        if self._involves_too_many_fingers():
-            return False
+        return self._fret_codes_are_valid(self._get_fret_codes())
 
-        if self._a_string_is_touched_twice():
+    @classmethod
+    def _fret_codes_are_valid(cls, fret_codes: List[int]) -> bool:
+        fretted_codes = [fret_code for fret_code in fret_codes if fret_code]
+        if cls._involves_too_many_fingers(fretted_codes):
             return False
 
-        if self._the_span_is_too_wide():
+        if cls._the_span_is_too_wide(fretted_codes):
             return False
 
         return True
 
-    def _involves_too_many_fingers(self) -> bool:
-        return len(self.placements) > NUMBER_OF_FINGERS_TO_CONSIDER
+    @staticmethod
+    def _involves_too_many_fingers(fretted_codes: List[int]) -> bool:
+        return len(fretted_codes) > NUMBER_OF_FINGERS_TO_CONSIDER
 
-    def _a_string_is_touched_twice(self) -> bool:
-        touched_strings = [placement.string for placement in self.placements]
-        return len(set(touched_strings)) < len(touched_strings)
-
-    def _the_span_is_too_wide(self) -> bool:
-        if not self.placements:
+    @staticmethod
+    def _the_span_is_too_wide(fretted_codes: List[int]) -> bool:
+        if not fretted_codes:
             return False
-        fret_numbers = [placement.fret.number for placement in self.placements]
-        return max(fret_numbers) - min(fret_numbers) > MAXIMUM_SPAN_OF_FRETS - 1
+        return max(fretted_codes) - min(fretted_codes) > MAXIMUM_SPAN_OF_FRETS - 1
 
     def __iter__(self) -> Generator[Placement, None, None]:
-        for p in self.placements:
-            yield p
+        for string in Guitar.STRINGS:
+            fret = self.find_fret_on(string)
+            if fret is not None:
+                yield Placement(string, fret)
 
     def __contains__(self, placement: Placement) -> bool:
-        return placement in self.placements
+        return (
+            self.touches(placement.string)
+            and self.get_fret_on(placement.string) == placement.fret
+        )
 
     def __repr__(self) -> str:
         return str(set(self.placements))
@@ -150,47 +339,110 @@ class HandPosition:
         return Guitar.get_notes(self)
 
     def has_some_overlapping_of_notes(self) -> bool:
-        notes = self.get_notes()
-        for i in range(len(notes) - 1):
-            if notes[i] > notes[i + 1]:
-                return True
-        return False
+        self._ensure_is_valid()
+        return self._has_some_overlapping_of_notes
 
     def _ensure_is_valid(self) -> None:
-        if not self.is_valid():
+        if not self._analyse():
             raise Exception("This isn't a valid hand-position.")
 
     def get_number_of_distinct_notes(self) -> int:
-        note_names = [note.name for note in self.get_notes()]
-        return len(set(note_names))
+        return bin(self.get_scale_degree_mask()).count("1")
+
+    def get_scale_degree_mask(self) -> int:
+        self._ensure_is_valid()
+        return self._scale_degree_mask
+
+    def get_open_string_mask(self) -> int:
+        self._ensure_is_valid()
+        return self._open_string_mask
+
+    def _analyse(self) -> bool:
+        is_valid = self._is_valid
+        if is_valid is None:
+            is_valid = self._work_out_analysis()
+        return is_valid
+
+    def _work_out_analysis(self) -> bool:
+        # Works out everything the filters need from one decoding of the code,
+        # rather than checking validity and recomputing the notes for each.
+        fret_codes = self._get_fret_codes()
+        if not self._fret_codes_are_valid(fret_codes):
+            object.__setattr__(self, "_is_valid", False)
+            return False
+
+        pitches: List[int] = []
+        has_some_overlapping_of_notes = False
+        scale_degree_mask = 0
+        open_string_mask = 0
+        for string, fret_code in zip(Guitar.STRINGS, fret_codes):
+            if not fret_code:
+                open_string_mask |= 1 << (string.number - 1)
+            note = string.note(FRETS_BY_FRET_CODE[fret_code])
+            if pitches and pitches[-1] > note.pitch:
+                has_some_overlapping_of_notes = True
+            scale_degree_mask |= 1 << note.scale_degree
+            pitches.append(note.pitch)
+
+        object.__setattr__(
+            self, "_has_some_overlapping_of_notes", has_some_overlapping_of_notes
+        )
+        object.__setattr__(self, "_scale_degree_mask", scale_degree_mask)
+        object.__setattr__(self, "_open_string_mask", open_string_mask)
+        object.__setattr__(self, "_lowest_pitch", min(pitches))
+        object.__setattr__(self, "_highest_pitch", max(pitches))
+        object.__setattr__(self, "_is_valid", True)
+        return True
 
     def touches(self, string: String) -> bool:
-        for placement in self.placements:
-            if placement.string == string:
-                return True
-        return False
+        return self._get_fret_code_on(string) != 0
 
     def get_fret_on(self, string: String) -> Fret:
-        for placement in self.placements:
-            if placement.string == string:
-                return placement.fret
-        raise Exception(f"{string} isn't touched by this hand-position.")
+        fret_code = self._get_fret_code_on(string)
+        if not fret_code:
+            raise Exception(f"{string} isn't touched by this hand-position.")
+        return Fret(fret_code - 1)
+
+    def find_fret_on(self, string: String) -> Optional[Fret]:
+        return FRETS_BY_FRET_CODE[self._get_fret_code_on(string)]
+
+    def _get_fret_code_on(self, string: String) -> int:
+        shift = get_string_index(string) * BITS_PER_STRING_IN_CODE
+        return (self.code >> shift) & FRET_CODE_MASK
 
     def get_open_strings(self) -> List[String]:
         self._ensure_is_valid()
         return Guitar.get_open_strings(self)
 
     def get_highest_note(self) -> Note:
-        return sorted(self.get_notes(), reverse=True)[0]
+        self._ensure_is_valid()
+        return Note.from_pitch(self._highest_pitch)
 
     def get_lowest_note(self) -> Note:
-        return sorted(self.get_notes())[0]
+        self._ensure_is_valid()
+        return Note.from_pitch(self._lowest_pitch)
 
     def lowest_note_is_lower(self, other: HandPosition) -> bool:
         return self.get_lowest_note() < other.get_lowest_note()
 
-    def get_frets(self) -> Set[Fret]:
-        return {placement.fret for placement in self.placements}
+    def get_frets(self) -> FrozenSet[Fret]:
+        frets = self._frets
+        if frets is None:
+            frets = frozenset(placement.fret for placement in self)
+            object.__setattr__(self, "_frets", frets)
+        return frets
+
+    def reaches_fret(self, fret: Fret) -> bool:
+        return any(placement.fret.number >= fret.number for placement in self)
+
+    def get_code(self) -> int:
+        return self.code
+
+    @classmethod
+    def from_code(cls, code: int) -> HandPosition:
+        hand_position = cls.__new__(cls)
+        hand_position._set_code(code)
+        return hand_position
 
 
 class Guitar:
@@ -198,20 +450,40 @@ class Guitar:
 
     @classmethod
     def get_notes(cls, hand_position: HandPosition) -> List[Note]:
-        notes = []
-        for string in cls.STRINGS:
-            if hand_position.touches(string):
-                notes.append(string.note(hand_position.get_fret_on(string)))
-            else:
-                notes.append(string.note())
-        return notes
+        return [
+            string.note(hand_position.find_fret_on(string)) for string in cls.STRINGS
+        ]
 
     @classmethod
     def get_open_strings(cls, hand_position: HandPosition) -> List[String]:
-        return sorted(
-            [string for string in cls.STRINGS if not hand_position.touches(string)],
-            key=lambda s: s.number,
-        )
+        # STRINGS runs from string 6 to string 1, so walking it backwards gives
+        # the open strings in order of number.
+        return [
+            string
+            for string in reversed(cls.STRINGS)
+            if not hand_position.touches(string)
+        ]
+
+
+def intern_the_notes_and_frets_the_search_uses() -> None:
+    # Notes, strings and frets are interned, so building the ones the search
+    # uses up front means the hot paths only ever look them up.
+    for pitch in range(NUMBER_OF_PITCHES_TO_INTERN):
+        Note.from_pitch(pitch)
+    for fret_number in range(FRET_CODE_MASK):
+        Fret(fret_number)
+
+
+intern_the_notes_and_frets_the_search_uses()
+
+# The fret each fret code stands for, with None for an open string.
+FRETS_BY_FRET_CODE: Tuple[Optional[Fret], ...] = (None,) + tuple(
+    Fret(fret_code - 1) for fret_code in range(1, FRET_CODE_MASK + 1)
+)
+
+
+def get_string_index(string: String) -> int:
+    return len(Guitar.STRINGS) - string.number
 
 
 @dataclass(frozen=True)
@@ -220,32 +492,38 @@ class PairOfHandPositions:
     second_hand_position: HandPosition
 
     def produces_all_the_notes(self) -> bool:
-        all_notes = (
-            self.first_hand_position.get_notes() + self.second_hand_position.get_notes()
-        )
-        return len(set([note.scale_degree for note in all_notes])) == 12
+        return (
+            self.first_hand_position.get_scale_degree_mask()
+            | self.second_hand_position.get_scale_degree_mask()
+        ) == ALL_SCALE_DEGREES_MASK
 
     def __eq__(self, other: Any) -> bool:
         if not isinstance(other, PairOfHandPositions):
             return NotImplemented
 
-        return {self.first_hand_position, self.second_hand_position} == {
-            other.first_hand_position,
-            other.second_hand_position,
-        }
+        return self.get_canonical_key() == other.get_canonical_key()
+
+    def __hash__(self) -> int:
+        return hash(self.get_canonical_key())
+
+    def get_canonical_key(self) -> FrozenSet[HandPosition]:
+        return frozenset((self.first_hand_position, self.second_hand_position))
 
     def __lt__(self, other: PairOfHandPositions) -> bool:
         if not isinstance(other, PairOfHandPositions):
             return NotImplemented
 
-        if self.get_lowest_note() < other.get_lowest_note():
-            return True
-
-        if self.get_lowest_note() == other.get_lowest_note():
-            if self.get_highest_note() < other.get_highest_note():
-                return True
+        return self.get_sort_key() < other.get_sort_key()
 
-        return False
+    def get_sort_key(self) -> Tuple[int, int, int, int]:
+        # Pairs sharing their lowest and highest notes are kept in a fixed
+        # order by their hand-positions' codes.
+        return (
+            self.get_lowest_note().pitch,
+            self.get_highest_note().pitch,
+            self.first_hand_position.get_code(),
+            self.second_hand_position.get_code(),
+        )
 
     def __repr__(self) -> str:
         return (
@@ -303,93 +581,346 @@ class PairOfHandPositions:
         return f"Frets {range_from_first} and {range_from_second}"
 
 
-def generate_all_placements(number_of_frets_to_consider: int) -> List[Placement]:
-    placements = []
-    for string in Guitar.STRINGS:
-        for fret in [Fret(i) for i in range(number_of_frets_to_consider)]:
-            placements.append(Placement(string, fret))
-    return placements
+class Stage(Enum):
+    GENERATING_POTENTIAL_HAND_POSITIONS = "generating potential hand-positions"
+    GENERATING_HAND_POSITIONS = "generating hand-positions"
+    SEARCHING_FOR_PAIRS = "searching for pairs"
 
 
-def filter_placements_given_lowest_fret(
-    placements: List[Placement], fret: Fret, maximum_span: int
-) -> List[Placement]:
-    return [
-        p
-        for p in placements
-        if p.fret.number >= fret.number
-        and p.fret.number <= fret.number + maximum_span - 1
+@dataclass(frozen=True)
+class Progress:
+    stage: Stage
+    examined: int
+    total: int
+    found: int
+    elapsed_seconds: float
+    is_finished: bool
+
+    @property
+    def examined_per_second(self) -> float:
+        if self.elapsed_seconds <= 0:
+            return 0.0
+        return self.examined / self.elapsed_seconds
+
+    @property
+    def estimated_seconds_remaining(self) -> Optional[float]:
+        if self.examined_per_second <= 0:
+            return None
+        return (self.total - self.examined) / self.examined_per_second
+
+
+ProgressCallback = Callable[[Progress], None]
+
+
+class ProgressTracker:
+    def __init__(
+        self,
+        stage: Stage,
+        total: int,
+        callback: Optional[ProgressCallback],
+        interval_in_seconds: float = DEFAULT_PROGRESS_INTERVAL_IN_SECONDS,
+    ) -> None:
+        self.stage = stage
+        self.total = total
+        self.callback = callback
+        self.interval_in_seconds = interval_in_seconds
+        self.examined = 0
+        self.found = 0
+        self.started_at = time.monotonic()
+        self.last_reported_at = self.started_at
+        if callback is not None:
+            self._report(self.started_at)
+
+    @classmethod
+    def silent(cls, total: int) -> ProgressTracker:
+        return cls(Stage.SEARCHING_FOR_PAIRS, total, None)
+
+    def advance(self, examined: int, found: int = 0) -> None:
+        if self.callback is None:
+            return
+
+        self.examined += examined
+        self.found += found
+        now = time.monotonic()
+        if (
+            self.examined < self.total
+            and now - self.last_reported_at >= self.interval_in_seconds
+        ):
+            self._report(now)
+
+    def finish(self) -> None:
+        if self.callback is not None:
+            self._report(time.monotonic(), is_finished=True)
+
+    def _report(self, now: float, is_finished: bool = False) -> None:
+        self.last_reported_at = now
+        if self.callback is None:
+            return
+        self.callback(
+            Progress(
+                self.stage,
+                self.examined,
+                self.total,
+                self.found,
+                now - self.started_at,
+                is_finished,
+            )
+        )
+
+
+def generate_valid_hand_positions_on_frets(
+    frets: List[Fret], lowest_fret_must_be_used: bool = False
+) -> Iterator[HandPosition]:
+    # Each string is either left open or given a single fret, and no more
+    # strings are fretted than there are fingers, so every hand-position
+    # built here is valid as long as the frets fit within the span.
+    placements_by_string = [
+        [Placement(string, fret) for fret in frets] for string in Guitar.STRINGS
     ]
 
+    def assign(
+        string_index: int, placements: List[Placement], uses_the_lowest_fret: bool
+    ) -> Iterator[HandPosition]:
+        if string_index == len(placements_by_string):
+            if uses_the_lowest_fret or not lowest_fret_must_be_used:
+                yield HandPosition(frozenset(placements))
+            return
+
+        yield from assign(string_index + 1, placements, uses_the_lowest_fret)
+        if len(placements) == NUMBER_OF_FINGERS_TO_CONSIDER:
+            return
+        for index, placement in enumerate(placements_by_string[string_index]):
+            placements.append(placement)
+            yield from assign(
+                string_index + 1, placements, uses_the_lowest_fret or index == 0
+            )
+            placements.pop()
+
+    return assign(0, [], False)
 
-def all_hand_positions_with_n_fingers(
-    placements: List[Placement], n: int
-) -> Set[HandPosition]:
-    if n == 0:
-        return {HandPosition(frozenset())}
-
-    all_hand_positions = set()
-    for p in placements:
-        for hand_position in all_hand_positions_with_n_fingers(placements, n - 1):
-            if p not in hand_position:
-                new_hand_position = HandPosition(
-                    frozenset((*hand_position.placements, p))
+
+@dataclass(frozen=True)
+class HandPositionShape:
+    # The fret on each of Guitar.STRINGS relative to the lowest fret used, or
+    # None where the string is left open.
+    fret_offsets: Tuple[Optional[int], ...]
+
+    @classmethod
+    def from_hand_position(cls, hand_position: HandPosition) -> HandPositionShape:
+        fret_numbers = [
+            (
+                hand_position.get_fret_on(string).number
+                if hand_position.touches(string)
+                else None
+            )
+            for string in Guitar.STRINGS
+        ]
+        lowest_fret_number = min(
+            (number for number in fret_numbers if number is not None), default=0
+        )
+        return cls(
+            tuple(
+                None if number is None else number - lowest_fret_number
+                for number in fret_numbers
+            )
+        )
+
+    @property
+    def width(self) -> int:
+        return max(
+            (offset + 1 for offset in self.fret_offsets if offset is not None),
+            default=0,
+        )
+
+    def get_code_at(self, lowest_fret: Fret) -> int:
+        code = 0
+        for index, offset in enumerate(self.fret_offsets):
+            if offset is not None:
+                code |= (lowest_fret.number + offset + 1) << (
+                    index * BITS_PER_STRING_IN_CODE
                 )
-                all_hand_positions.add(new_hand_position)
+        return code
 
-    return all_hand_positions
 
+@lru_cache(maxsize=None)
+def get_all_hand_position_shapes() -> Tuple[HandPositionShape, ...]:
+    frets = [Fret(i) for i in range(MAXIMUM_SPAN_OF_FRETS)]
+    return tuple(
+        HandPositionShape.from_hand_position(hand_position)
+        for hand_position in generate_valid_hand_positions_on_frets(
+            frets, lowest_fret_must_be_used=True
+        )
+    )
 
-def generate_hand_positions_for_a_set_of_placements(
-    placements: List[Placement],
-) -> Set[HandPosition]:
-    hand_positions = set()
-    for i in range(NUMBER_OF_FINGERS_TO_CONSIDER + 1):
-        for hand_position in all_hand_positions_with_n_fingers(placements, i):
-            hand_positions.add(hand_position)
-    return hand_positions
+
+@dataclass(frozen=True)
+class ShapesAndOffsets:
+    # Every potential hand-position is one of the shapes moved up to start on
+    # one of the frets, so they can be walked without building them all.
+    shapes: Tuple[HandPositionShape, ...]
+    number_of_frets_to_consider: int
+
+    @classmethod
+    def for_frets(cls, number_of_frets_to_consider: int) -> ShapesAndOffsets:
+        if number_of_frets_to_consider > FRET_CODE_MASK:
+            raise Exception(
+                f"Frets above {FRET_CODE_MASK - 1} are too high up to be encoded."
+            )
+        return cls(get_all_hand_position_shapes(), number_of_frets_to_consider)
+
+    def get_shapes_starting_on(
+        self, lowest_fret: Fret, previous_number_of_frets: int = 0
+    ) -> List[HandPositionShape]:
+        # Given a previous number of frets, only the shapes reaching one of the
+        # frets added since are kept.
+        return [
+            shape
+            for shape in self.shapes
+            if previous_number_of_frets
+            < lowest_fret.number + shape.width
+            <= self.number_of_frets_to_consider
+        ]
+
+    def __iter__(self) -> Iterator[Tuple[HandPositionShape, Fret]]:
+        for lowest_fret_number in range(self.number_of_frets_to_consider):
+            lowest_fret = Fret(lowest_fret_number)
+            for shape in self.get_shapes_starting_on(lowest_fret):
+                yield shape, lowest_fret
+
+    def __len__(self) -> int:
+        return sum(
+            max(self.number_of_frets_to_consider - shape.width + 1, 0)
+            for shape in self.shapes
+        )
+
+    def iter_hand_positions_starting_on(
+        self, lowest_fret: Fret, previous_number_of_frets: int = 0
+    ) -> Iterator[HandPosition]:
+        for code in self.iter_codes_starting_on(lowest_fret, previous_number_of_frets):
+            yield HandPosition.from_code(code)
+
+    def iter_codes_starting_on(
+        self, lowest_fret: Fret, previous_number_of_frets: int = 0
+    ) -> Iterator[int]:
+        for shape in self.get_shapes_starting_on(lowest_fret, previous_number_of_frets):
+            yield shape.get_code_at(lowest_fret)
 
 
 def generate_all_potential_hand_positions(
     number_of_frets_to_consider: int,
+    progress: Optional[ProgressCallback] = None,
+    progress_interval_in_seconds: float = DEFAULT_PROGRESS_INTERVAL_IN_SECONDS,
+    number_of_workers: int = 1,
+    previous_number_of_frets: Optional[int] = None,
 ) -> Set[HandPosition]:
-    all_placements = generate_all_placements(number_of_frets_to_consider)
+    # Every fretted hand-position is generated in the one window that starts on
+    # its lowest fret, so windows never produce the same hand-position twice.
+    # The shapes are worked out once and moved up to each window. Given a
+    # previous number of frets, only the windows that can reach one of the new
+    # frets are looked at, and only the hand-positions that do are kept.
     all_hand_positions: Set[HandPosition] = set()
-    highest_fret = max(
-        number_of_frets_to_consider - MAXIMUM_SPAN_OF_FRETS + 1, MAXIMUM_SPAN_OF_FRETS
+    if previous_number_of_frets is None:
+        all_hand_positions.add(HandPosition(frozenset()))
+        previous_number_of_frets = 0
+    shapes_and_offsets = ShapesAndOffsets.for_frets(number_of_frets_to_consider)
+    frets_to_consider_as_lowest_fret = [
+        Fret(i)
+        for i in range(
+            max(previous_number_of_frets - MAXIMUM_SPAN_OF_FRETS + 1, 0),
+            number_of_frets_to_consider,
+        )
+    ]
+    tracker = ProgressTracker(
+        Stage.GENERATING_POTENTIAL_HAND_POSITIONS,
+        len(frets_to_consider_as_lowest_fret),
+        progress,
+        progress_interval_in_seconds,
     )
-    frets_to_consider_as_lowest_fret = [Fret(i) for i in range(0, highest_fret)]
+    if number_of_workers > 1:
+        windows = [
+            (
+                lowest_fret.number,
+                number_of_frets_to_consider,
+                previous_number_of_frets,
+            )
+            for lowest_fret in frets_to_consider_as_lowest_fret
+        ]
+        with ProcessPoolExecutor(max_workers=number_of_workers) as executor:
+            for codes in executor.map(_generate_codes_for_window, windows):
+                all_hand_positions.update(HandPosition.from_code(c) for c in codes)
+                tracker.advance(1, len(codes))
+        tracker.finish()
+        return all_hand_positions
+
     for lowest_fret in frets_to_consider_as_lowest_fret:
-        placements_starting_on_this_fret = filter_placements_given_lowest_fret(
-            all_placements, lowest_fret, MAXIMUM_SPAN_OF_FRETS
-        )
-        hand_positions_starting_on_this_fret = (
-            generate_hand_positions_for_a_set_of_placements(
-                placements_starting_on_this_fret
+        number_found_so_far = len(all_hand_positions)
+        all_hand_positions.update(
+            shapes_and_offsets.iter_hand_positions_starting_on(
+                lowest_fret, previous_number_of_frets
             )
         )
-        all_hand_positions = all_hand_positions.union(
-            hand_positions_starting_on_this_fret
-        )
+        tracker.advance(1, len(all_hand_positions) - number_found_so_far)
+    tracker.finish()
     return all_hand_positions
 
 
-def filter_out_unreasonable_hand_positions(
+def _generate_codes_for_window(window: Tuple[int, int, int]) -> List[int]:
+    lowest_fret_number, number_of_frets_to_consider, previous_number_of_frets = window
+    return list(
+        ShapesAndOffsets.for_frets(number_of_frets_to_consider).iter_codes_starting_on(
+            Fret(lowest_fret_number), previous_number_of_frets
+        )
+    )
+
+
+def filter_out_hand_positions_with_overlapping_notes(
     hand_positions: Set[HandPosition],
 ) -> Set[HandPosition]:
-    return {
-        hp
-        for hp in hand_positions
-        if hp.is_valid() and not hp.has_some_overlapping_of_notes()
-    }
+    return {hp for hp in hand_positions if not hp.has_some_overlapping_of_notes()}
 
 
-def generate_all_hand_positions(number_of_frets_to_consider: int) -> Set[HandPosition]:
-    return filter_out_unreasonable_hand_positions(
-        generate_all_potential_hand_positions(number_of_frets_to_consider)
+def generate_all_hand_positions(
+    number_of_frets_to_consider: int,
+    progress: Optional[ProgressCallback] = None,
+    progress_interval_in_seconds: float = DEFAULT_PROGRESS_INTERVAL_IN_SECONDS,
+    number_of_workers: int = 1,
+) -> Set[HandPosition]:
+    # Every potential hand-position is valid already, so only the notes need
+    # checking.
+    return filter_out_hand_positions_with_overlapping_notes(
+        generate_all_potential_hand_positions(
+            number_of_frets_to_consider,
+            progress,
+            progress_interval_in_seconds,
+            number_of_workers,
+        )
     )
 
 
+def generate_all_hand_positions_reaching_new_frets(
+    previous_number_of_frets: int,
+    number_of_frets_to_consider: int,
+    progress: Optional[ProgressCallback] = None,
+    progress_interval_in_seconds: float = DEFAULT_PROGRESS_INTERVAL_IN_SECONDS,
+    number_of_workers: int = 1,
+) -> Set[HandPosition]:
+    return filter_out_hand_positions_with_overlapping_notes(
+        generate_all_potential_hand_positions(
+            number_of_frets_to_consider,
+            progress,
+            progress_interval_in_seconds,
+            number_of_workers,
+            previous_number_of_frets,
+        )
+    )
+
+
+def filter_hand_positions_reaching_fret(
+    hand_positions: Set[HandPosition], fret: Fret
+) -> Set[HandPosition]:
+    return {hp for hp in hand_positions if hp.reaches_fret(fret)}
+
+
 def filter_out_hand_positions_with_repeated_notes(
     hand_positions: Set[HandPosition],
 ) -> Set[HandPosition]:
@@ -400,36 +931,748 @@ def filter_out_hand_positions_with_repeated_notes(
     }
 
 
+def generate_hand_positions_with_no_repeated_notes(
+    number_of_frets_to_consider: int,
+    progress: Optional[ProgressCallback] = None,
+    progress_interval_in_seconds: float = DEFAULT_PROGRESS_INTERVAL_IN_SECONDS,
+) -> Set[HandPosition]:
+    # Strings are given notes from the lowest to the highest, and a branch is
+    # cut as soon as a note isn't above the one before it or repeats a scale
+    # degree, so only hand-positions that survive both filters get built.
+    placements_by_string = [
+        [Placement(string, Fret(i)) for i in range(number_of_frets_to_consider)]
+        for string in Guitar.STRINGS
+    ]
+    open_pitches = [string.note().pitch for string in Guitar.STRINGS]
+    hand_positions: Set[HandPosition] = set()
+
+    def assign(
+        string_index: int,
+        placements: List[Placement],
+        previous_pitch: int,
+        scale_degree_mask: int,
+        lowest_fret_number: int,
+        highest_fret_number: int,
+    ) -> None:
+        if string_index == len(placements_by_string):
+            hand_positions.add(HandPosition(frozenset(placements)))
+            return
+
+        open_pitch = open_pitches[string_index]
+        if open_pitch > previous_pitch and not scale_degree_mask & (
+            1 << open_pitch % 12
+        ):
+            assign(
+                string_index + 1,
+                placements,
+                open_pitch,
+                scale_degree_mask | 1 << open_pitch % 12,
+                lowest_fret_number,
+                highest_fret_number,
+            )
+        if string_index == 0:
+            tracker.advance(1, len(hand_positions) - tracker.found)
+
+        if len(placements) == NUMBER_OF_FINGERS_TO_CONSIDER:
+            return
+        for placement in placements_by_string[string_index]:
+            fret_number = placement.fret.number
+            pitch = open_pitch + fret_number + 1
+            if (
+                max(highest_fret_number, fret_number)
+                - min(lowest_fret_number, fret_number)
+                <= MAXIMUM_SPAN_OF_FRETS - 1
+                and pitch > previous_pitch
+                and not scale_degree_mask & (1 << pitch % 12)
+            ):
+                placements.append(placement)
+                assign(
+                    string_index + 1,
+                    placements,
+                    pitch,
+                    scale_degree_mask | 1 << pitch % 12,
+                    min(lowest_fret_number, fret_number),
+                    max(highest_fret_number, fret_number),
+                )
+                placements.pop()
+            if string_index == 0:
+                tracker.advance(1, len(hand_positions) - tracker.found)
+
+    # Progress is reported after each choice for the lowest string: leaving it
+    # open, or fretting it on each of the frets.
+    tracker = ProgressTracker(
+        Stage.GENERATING_HAND_POSITIONS,
+        number_of_frets_to_consider + 1,
+        progress,
+        progress_interval_in_seconds,
+    )
+    assign(0, [], -1, 0, number_of_frets_to_consider, -1)
+    tracker.finish()
+    return hand_positions
+
+
+def generate_hand_positions_with_no_repeated_notes_with_numpy(
+    number_of_frets_to_consider: int,
+) -> Set[HandPosition]:
+    # Each row of the fret matrix is a potential hand-position, with -1 for an
+    # open string. The notes are checked a column at a time, and only the rows
+    # that survive are turned into hand-positions.
+    if np is None:
+        return generate_hand_positions_with_no_repeated_notes(
+            number_of_frets_to_consider
+        )
+
+    frets = build_fret_matrix(number_of_frets_to_consider)
+    frets = frets[work_out_rows_with_no_repeated_notes(frets)]
+    codes = np.zeros(len(frets), dtype=np.int64)
+    for index in range(len(Guitar.STRINGS)):
+        codes |= (frets[:, index].astype(np.int64) + 1) << (
+            index * BITS_PER_STRING_IN_CODE
+        )
+    return {HandPosition.from_code(code) for code in codes.tolist()}
+
+
+def build_fret_matrix(number_of_frets_to_consider: int) -> Any:
+    # Shapes are valid by construction, so moving them up the neck gives every
+    # valid hand-position without having to check the fingers or the span.
+    shapes = get_all_hand_position_shapes()
+    offsets = np.array(
+        [
+            [-1 if offset is None else offset for offset in shape.fret_offsets]
+            for shape in shapes
+        ],
+        dtype=np.int16,
+    ).reshape(-1, len(Guitar.STRINGS))
+    widths = np.array([shape.width for shape in shapes], dtype=np.int16)
+    is_fretted = offsets >= 0
+
+    blocks = [np.full((1, len(Guitar.STRINGS)), -1, dtype=np.int16)]
+    for lowest_fret_number in range(number_of_frets_to_consider):
+        fitting = lowest_fret_number + widths <= number_of_frets_to_consider
+        blocks.append(
+            np.where(
+                is_fretted[fitting],
+                offsets[fitting] + lowest_fret_number,
+                np.int16(-1),
+            )
+        )
+    return np.concatenate(blocks)
+
+
+def work_out_rows_with_no_repeated_notes(frets: Any) -> Any:
+    open_pitches = np.array(
+        [string.note().pitch for string in Guitar.STRINGS], dtype=np.int16
+    )
+    pitches = open_pitches + np.where(frets >= 0, frets + 1, 0)
+    has_no_overlapping_of_notes = np.all(np.diff(pitches, axis=1) >= 0, axis=1)
+    scale_degrees = np.sort(pitches % 12, axis=1)
+    has_distinct_notes = np.all(np.diff(scale_degrees, axis=1) > 0, axis=1)
+    return has_no_overlapping_of_notes & has_distinct_notes
+
+
+class HandPositionCache:
+    # Each entry is a file of hand-position codes, stored as little-endian
+    # 32-bit integers and named after a hash of everything that decides which
+    # hand-positions get generated. Reading an entry marks it as recently used,
+    # and the least recently used entries are evicted once the directory grows
+    # too big.
+    SUFFIX = ".codes"
+
+    def __init__(
+        self,
+        directory: Path = DEFAULT_HAND_POSITION_CACHE_DIRECTORY,
+        maximum_size_in_bytes: int = DEFAULT_MAXIMUM_HAND_POSITION_CACHE_SIZE_IN_BYTES,
+    ) -> None:
+        self.directory = Path(directory)
+        self.maximum_size_in_bytes = maximum_size_in_bytes
+
+    @staticmethod
+    def get_key(name: str, number_of_frets_to_consider: int) -> str:
+        parameters = (
+            HAND_POSITION_CACHE_FORMAT_VERSION,
+            name,
+            number_of_frets_to_consider,
+            NUMBER_OF_FINGERS_TO_CONSIDER,
+            MAXIMUM_SPAN_OF_FRETS,
+            tuple(string.note().pitch for string in Guitar.STRINGS),
+        )
+        return hashlib.sha256(repr(parameters).encode()).hexdigest()
+
+    def get_or_generate(
+        self,
+        name: str,
+        number_of_frets_to_consider: int,
+        generate: Callable[[], Set[HandPosition]],
+        extend: Optional[Callable[[int, Set[HandPosition]], Set[HandPosition]]] = None,
+    ) -> Set[HandPosition]:
+        # Given a way to extend them, the hand-positions cached for the most
+        # frets below this many are extended rather than generated again.
+        key = self.get_key(name, number_of_frets_to_consider)
+        hand_positions = self.load(key)
+        if hand_positions is not None:
+            return hand_positions
+
+        if extend is not None:
+            for previous_number_of_frets in range(
+                number_of_frets_to_consider - 1, 0, -1
+            ):
+                previous_hand_positions = self.load(
+                    self.get_key(name, previous_number_of_frets)
+                )
+                if previous_hand_positions is not None:
+                    hand_positions = extend(
+                        previous_number_of_frets, previous_hand_positions
+                    )
+                    break
+        if hand_positions is None:
+            hand_positions = generate()
+        self.store(key, hand_positions)
+        return hand_positions
+
+    def load(self, key: str) -> Optional[Set[HandPosition]]:
+        path = self._get_path(key)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+        # A truncated or corrupt entry is treated as missing, and removed so it
+        # gets written again.
+        codes = array("I")
+        try:
+            codes.frombytes(data)
+        except ValueError:
+            path.unlink(missing_ok=True)
+            return None
+        if sys.byteorder == "big":
+            codes.byteswap()
+        if any(
+            code >> (len(Guitar.STRINGS) * BITS_PER_STRING_IN_CODE) for code in codes
+        ):
+            path.unlink(missing_ok=True)
+            return None
+
+        os.utime(path)
+        return {HandPosition.from_code(code) for code in codes}
+
+    def store(self, key: str, hand_positions: Set[HandPosition]) -> None:
+        codes = array("I", sorted(hp.get_code() for hp in hand_positions))
+        if sys.byteorder == "big":
+            codes.byteswap()
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._get_path(key)
+        temporary_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        temporary_path.write_bytes(codes.tobytes())
+        os.replace(temporary_path, path)
+        self._evict()
+
+    def _get_path(self, key: str) -> Path:
+        return self.directory / f"{key}{self.SUFFIX}"
+
+    def _evict(self) -> None:
+        entries = sorted(
+            (path.stat().st_mtime, path.stat().st_size, path)
+            for path in self.directory.glob(f"*{self.SUFFIX}")
+        )
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total_size <= self.maximum_size_in_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total_size -= size
+
+
+class PairSearchEngine(Enum):
+    BRUTE_FORCE = "brute-force"
+    COMPLEMENT_MASK = "complement-mask"
+    NUMPY = "numpy"
+
+
 def work_out_successful_pairs_of_hand_positions(
     hand_positions: Set[HandPosition],
+    engine: PairSearchEngine = PairSearchEngine.COMPLEMENT_MASK,
+    number_of_workers: int = 1,
+    allowed_open_strings: Optional[Iterable[Set[String]]] = None,
+    progress: Optional[ProgressCallback] = None,
+    progress_interval_in_seconds: float = DEFAULT_PROGRESS_INTERVAL_IN_SECONDS,
 ) -> Set[PairOfHandPositions]:
-    successful_hand_positions: Set[PairOfHandPositions] = set()
-    number_of_cases = len(hand_positions) ** 2
-    print(f"Looking through {number_of_cases:,} pairs...")
-
-    count = 0
-    for x in hand_positions:
-        for y in hand_positions:
-            count += 1
-            if count % 250_000 == 0:
-                print(f"Done {count:,}")
-            pair = PairOfHandPositions(x, y)
+    return set(
+        iter_successful_pairs(
+            hand_positions,
+            engine,
+            number_of_workers,
+            allowed_open_strings,
+            progress,
+            progress_interval_in_seconds,
+        )
+    )
+
+
+def iter_successful_pairs(
+    hand_positions: Set[HandPosition],
+    engine: PairSearchEngine = PairSearchEngine.COMPLEMENT_MASK,
+    number_of_workers: int = 1,
+    allowed_open_strings: Optional[Iterable[Set[String]]] = None,
+    progress: Optional[ProgressCallback] = None,
+    progress_interval_in_seconds: float = DEFAULT_PROGRESS_INTERVAL_IN_SECONDS,
+) -> Iterator[PairOfHandPositions]:
+    def start_tracking(total: int) -> ProgressTracker:
+        return ProgressTracker(
+            Stage.SEARCHING_FOR_PAIRS, total, progress, progress_interval_in_seconds
+        )
+
+    allowed_open_string_masks = get_allowed_open_string_masks(allowed_open_strings)
+    if allowed_open_string_masks is not None:
+        hand_positions = filter_out_hand_positions_which_leave_other_strings_open(
+            hand_positions, allowed_open_string_masks
+        )
+
+    if engine is PairSearchEngine.BRUTE_FORCE:
+        return iter_successful_pairs_by_brute_force(
+            hand_positions, allowed_open_string_masks, start_tracking
+        )
+    if engine is PairSearchEngine.NUMPY and np is not None:
+        return iter_successful_pairs_with_numpy(
+            hand_positions, allowed_open_string_masks, start_tracking
+        )
+    if number_of_workers > 1:
+        return iter_successful_pairs_in_parallel(
+            hand_positions, number_of_workers, allowed_open_string_masks, start_tracking
+        )
+    return iter_successful_pairs_by_complement_mask(
+        hand_positions, allowed_open_string_masks, start_tracking
+    )
+
+
+def count_successful_pairs(
+    hand_positions: Set[HandPosition],
+    allowed_open_strings: Optional[Iterable[Set[String]]] = None,
+) -> Dict[FrozenSet[String], int]:
+    allowed_open_string_masks = get_allowed_open_string_masks(allowed_open_strings)
+    if allowed_open_string_masks is not None:
+        hand_positions = filter_out_hand_positions_which_leave_other_strings_open(
+            hand_positions, allowed_open_string_masks
+        )
+
+    counts_by_open_string_mask: Dict[int, int] = defaultdict(int)
+    for (
+        group,
+        complementary_group,
+        combined_open_string_mask,
+    ) in iter_complementary_groups(
+        group_hand_positions_by_masks(hand_positions), allowed_open_string_masks
+    ):
+        counts_by_open_string_mask[combined_open_string_mask] += len(group) * len(
+            complementary_group
+        )
+
+    return {
+        get_strings_from_open_string_mask(open_string_mask): count
+        for open_string_mask, count in counts_by_open_string_mask.items()
+    }
+
+
+def get_open_string_mask(open_strings: Iterable[String]) -> int:
+    mask = 0
+    for string in open_strings:
+        mask |= 1 << (string.number - 1)
+    return mask
+
+
+def get_strings_from_open_string_mask(open_string_mask: int) -> FrozenSet[String]:
+    return frozenset(
+        string
+        for string in Guitar.STRINGS
+        if open_string_mask & get_open_string_mask([string])
+    )
+
+
+def get_allowed_open_string_masks(
+    allowed_open_strings: Optional[Iterable[Set[String]]],
+) -> Optional[FrozenSet[int]]:
+    if allowed_open_strings is None:
+        return None
+    return frozenset(
+        get_open_string_mask(open_strings) for open_strings in allowed_open_strings
+    )
+
+
+def filter_out_hand_positions_which_leave_other_strings_open(
+    hand_positions: Set[HandPosition], allowed_open_string_masks: FrozenSet[int]
+) -> Set[HandPosition]:
+    return {
+        hand_position
+        for hand_position in hand_positions
+        if any(
+            hand_position.get_open_string_mask() & ~allowed_mask == 0
+            for allowed_mask in allowed_open_string_masks
+        )
+    }
+
+
+def iter_successful_pairs_by_brute_force(
+    hand_positions: Set[HandPosition],
+    allowed_open_string_masks: Optional[FrozenSet[int]] = None,
+    start_tracking: Callable[[int], ProgressTracker] = ProgressTracker.silent,
+) -> Iterator[PairOfHandPositions]:
+    ordered_hand_positions = list(hand_positions)
+    number_of_hand_positions = len(ordered_hand_positions)
+    tracker = start_tracking(
+        number_of_hand_positions * (number_of_hand_positions - 1) // 2
+    )
+
+    open_string_masks = [
+        hand_position.get_open_string_mask() for hand_position in ordered_hand_positions
+    ]
+    for i, x in enumerate(ordered_hand_positions):
+        found_with_x = 0
+        for j in range(i + 1, number_of_hand_positions):
+            if (
+                allowed_open_string_masks is not None
+                and open_string_masks[i] | open_string_masks[j]
+                not in allowed_open_string_masks
+            ):
+                continue
+            pair = PairOfHandPositions(x, ordered_hand_positions[j])
             if pair.produces_all_the_notes():
-                already_found = False
-                for existing_pair in successful_hand_positions:
-                    if existing_pair == pair:
-                        already_found = True
-                if not already_found:
-                    successful_hand_positions.add(pair)
-    return successful_hand_positions
+                found_with_x += 1
+                yield pair
+        tracker.advance(number_of_hand_positions - 1 - i, found_with_x)
+    tracker.finish()
 
 
-def filter_out_solutions_without_the_right_open_strings(
-    solutions: List[PairOfHandPositions],
-    desired_open_strings: Set[String],
-) -> List[PairOfHandPositions]:
+def group_hand_positions_by_scale_degree_mask(
+    hand_positions: Set[HandPosition],
+) -> Dict[int, List[HandPosition]]:
+    hand_positions_by_mask: Dict[int, List[HandPosition]] = defaultdict(list)
+    for hand_position in hand_positions:
+        hand_positions_by_mask[hand_position.get_scale_degree_mask()].append(
+            hand_position
+        )
+    return hand_positions_by_mask
+
+
+def group_hand_positions_by_masks(
+    hand_positions: Set[HandPosition],
+) -> Dict[int, Dict[int, List[HandPosition]]]:
+    hand_positions_by_masks: Dict[int, Dict[int, List[HandPosition]]] = defaultdict(
+        lambda: defaultdict(list)
+    )
+    for hand_position in hand_positions:
+        hand_positions_by_masks[hand_position.get_scale_degree_mask()][
+            hand_position.get_open_string_mask()
+        ].append(hand_position)
+    return hand_positions_by_masks
+
+
+def iter_successful_pairs_by_complement_mask(
+    hand_positions: Set[HandPosition],
+    allowed_open_string_masks: Optional[FrozenSet[int]] = None,
+    start_tracking: Callable[[int], ProgressTracker] = ProgressTracker.silent,
+) -> Iterator[PairOfHandPositions]:
+    # A hand-position sounds one note per string, so it covers at most six scale
+    # degrees. Two of them cover all twelve only when their masks are exact
+    # complements, which lets us look partners up instead of trying everyone.
+    # Only visiting each pair of groups from its lower mask means every pair is
+    # found exactly once.
+    pairs_of_groups = find_pairs_of_complementary_groups(
+        group_hand_positions_by_masks(hand_positions), allowed_open_string_masks
+    )
+    tracker = start_tracking(count_pairs_in_groups(pairs_of_groups))
+
+    for group, complementary_group in pairs_of_groups:
+        for x in group:
+            for y in complementary_group:
+                yield PairOfHandPositions(x, y)
+        number_of_pairs = len(group) * len(complementary_group)
+        tracker.advance(number_of_pairs, number_of_pairs)
+    tracker.finish()
+
+
+def iter_successful_pairs_with_numpy(
+    hand_positions: Set[HandPosition],
+    allowed_open_string_masks: Optional[FrozenSet[int]] = None,
+    start_tracking: Callable[[int], ProgressTracker] = ProgressTracker.silent,
+) -> Iterator[PairOfHandPositions]:
+    ordered_hand_positions = list(hand_positions)
+    masks = np.array(
+        [
+            hand_position.get_scale_degree_mask()
+            for hand_position in ordered_hand_positions
+        ],
+        dtype=np.uint16,
+    )
+    open_string_masks = np.array(
+        [
+            hand_position.get_open_string_mask()
+            for hand_position in ordered_hand_positions
+        ],
+        dtype=np.uint8,
+    )
+    if allowed_open_string_masks is not None:
+        allowed = np.array(sorted(allowed_open_string_masks), dtype=np.uint8)
+    number_of_hand_positions = len(masks)
+    tracker = start_tracking(
+        number_of_hand_positions * (number_of_hand_positions - 1) // 2
+    )
+
+    rows_per_block = max(
+        1, NUMPY_BLOCK_SIZE_IN_PAIRS // max(number_of_hand_positions, 1)
+    )
+    for start in range(0, number_of_hand_positions, rows_per_block):
+        stop = min(start + rows_per_block, number_of_hand_positions)
+        first_column = start + 1
+        combined_masks = masks[start:stop, np.newaxis] | masks[first_column:]
+        matching = combined_masks == ALL_SCALE_DEGREES_MASK
+        if allowed_open_string_masks is not None:
+            combined_open_string_masks = (
+                open_string_masks[start:stop, np.newaxis]
+                | open_string_masks[first_column:]
+            )
+            matching &= np.isin(combined_open_string_masks, allowed)
+        rows, columns = np.nonzero(matching)
+        found_in_block = 0
+        for i, j in zip((rows + start).tolist(), (columns + first_column).tolist()):
+            if i < j:
+                found_in_block += 1
+                yield PairOfHandPositions(
+                    ordered_hand_positions[i], ordered_hand_positions[j]
+                )
+        tracker.advance(
+            count_pairs_above_the_diagonal(number_of_hand_positions, start, stop),
+            found_in_block,
+        )
+    tracker.finish()
+
+
+def iter_successful_pairs_in_parallel(
+    hand_positions: Set[HandPosition],
+    number_of_workers: int,
+    allowed_open_string_masks: Optional[FrozenSet[int]] = None,
+    start_tracking: Callable[[int], ProgressTracker] = ProgressTracker.silent,
+) -> Iterator[PairOfHandPositions]:
+    # Joining the groups with complementary masks is cheap, so it's done here
+    # once, and the workers only pair up the hand-positions in their share of
+    # the pairs of groups. They're sent compact integer codes rather than
+    # hand-positions, and send codes back.
+    pairs_of_groups = find_pairs_of_complementary_groups(
+        group_hand_positions_by_masks(hand_positions), allowed_open_string_masks
+    )
+    hand_positions_by_code = {
+        hand_position.get_code(): hand_position for hand_position in hand_positions
+    }
+    pairs_of_code_groups = [
+        (
+            [hand_position.get_code() for hand_position in group],
+            [hand_position.get_code() for hand_position in complementary_group],
+        )
+        for group, complementary_group in pairs_of_groups
+    ]
+    number_of_shards = number_of_workers * 4
+    shard_size = -(-len(pairs_of_code_groups) // number_of_shards) or 1
+    shards = [
+        pairs_of_code_groups[start:stop]
+        for start, stop in zip(
+            range(0, len(pairs_of_code_groups), shard_size),
+            range(shard_size, len(pairs_of_code_groups) + shard_size, shard_size),
+        )
+    ]
+    tracker = start_tracking(count_pairs_in_groups(pairs_of_groups))
+
+    with ProcessPoolExecutor(max_workers=number_of_workers) as executor:
+        for pairs_of_codes in executor.map(_pair_up_codes_in_groups, shards):
+            for first_code, second_code in pairs_of_codes:
+                yield PairOfHandPositions(
+                    hand_positions_by_code[first_code],
+                    hand_positions_by_code[second_code],
+                )
+            tracker.advance(len(pairs_of_codes), len(pairs_of_codes))
+    tracker.finish()
+
+
+def count_pairs_above_the_diagonal(size: int, start: int, stop: int) -> int:
+    return sum(size - 1 - row for row in range(start, stop))
+
+
+def find_pairs_of_complementary_groups(
+    hand_positions_by_masks: Dict[int, Dict[int, List[HandPosition]]],
+    allowed_open_string_masks: Optional[FrozenSet[int]] = None,
+) -> List[Tuple[List[HandPosition], List[HandPosition]]]:
+    return [
+        (group, complementary_group)
+        for group, complementary_group, _ in iter_complementary_groups(
+            hand_positions_by_masks, allowed_open_string_masks
+        )
+    ]
+
+
+def iter_complementary_groups(
+    hand_positions_by_masks: Dict[int, Dict[int, List[HandPosition]]],
+    allowed_open_string_masks: Optional[FrozenSet[int]] = None,
+) -> Iterator[Tuple[List[HandPosition], List[HandPosition], int]]:
+    # Each pair of groups is yielded once, from the one with the lower mask,
+    # along with the strings the pair leaves open between them.
+    for mask, groups in hand_positions_by_masks.items():
+        complementary_mask = ALL_SCALE_DEGREES_MASK ^ mask
+        if (
+            mask > complementary_mask
+            or complementary_mask not in hand_positions_by_masks
+        ):
+            continue
+        complementary_groups = hand_positions_by_masks[complementary_mask]
+        for open_string_mask, group in groups.items():
+            for (
+                complementary_open_string_mask,
+                complementary_group,
+            ) in complementary_groups.items():
+                combined_open_string_mask = (
+                    open_string_mask | complementary_open_string_mask
+                )
+                if (
+                    allowed_open_string_masks is None
+                    or combined_open_string_mask in allowed_open_string_masks
+                ):
+                    yield group, complementary_group, combined_open_string_mask
+
+
+def count_pairs_in_groups(
+    pairs_of_groups: List[Tuple[List[HandPosition], List[HandPosition]]],
+) -> int:
+    return sum(
+        len(group) * len(complementary_group)
+        for group, complementary_group in pairs_of_groups
+    )
+
+
+def _pair_up_codes_in_groups(
+    pairs_of_code_groups: List[Tuple[List[int], List[int]]],
+) -> List[Tuple[int, int]]:
     return [
-        pair
-        for pair in solutions
-        if pair.get_all_open_strings() == desired_open_strings
+        (first_code, second_code)
+        for group, complementary_group in pairs_of_code_groups
+        for first_code in group
+        for second_code in complementary_group
     ]
+
+
+def find_covering_groups(
+    hand_positions: Set[HandPosition], k: int
+) -> Iterator[Tuple[HandPosition, ...]]:
+    # Groups are found as non-decreasing sequences of scale-degree masks, so
+    # every unordered group turns up once. A mask may repeat as many times as it
+    # has hand-positions. Groups are only expanded into hand-positions once
+    # their masks are known to cover everything.
+    if k < 1:
+        raise Exception("A group needs at least one hand-position.")
+
+    hand_positions_by_mask = group_hand_positions_by_scale_degree_mask(hand_positions)
+    masks = sorted(hand_positions_by_mask)
+    group_sizes = [len(hand_positions_by_mask[mask]) for mask in masks]
+    coverable = work_out_coverable_scale_degrees(masks, k - 1)
+    indices_of_masks_covering: Dict[int, List[int]] = defaultdict(list)
+    for index, mask in enumerate(masks):
+        for submask in iter_submasks(mask):
+            indices_of_masks_covering[submask].append(index)
+
+    def extend(
+        chosen: List[int], times_last_was_chosen: int, covered: int
+    ) -> Iterator[List[int]]:
+        remaining = k - len(chosen)
+        first_index = chosen[-1] if chosen else 0
+        if times_last_was_chosen and (
+            times_last_was_chosen == group_sizes[first_index]
+        ):
+            first_index += 1
+
+        candidates: Iterable[int] = range(first_index, len(masks))
+        if remaining == 1:
+            covering = indices_of_masks_covering.get(
+                ALL_SCALE_DEGREES_MASK & ~covered, []
+            )
+            first_covering = bisect_left(covering, first_index)
+            candidates = covering[first_covering:]
+
+        for index in candidates:
+            now_covered = covered | masks[index]
+            if not coverable[remaining - 1][ALL_SCALE_DEGREES_MASK & ~now_covered]:
+                continue
+            repeats = times_last_was_chosen + 1 if chosen and chosen[-1] == index else 1
+            chosen.append(index)
+            if remaining == 1:
+                yield chosen
+            else:
+                yield from extend(chosen, repeats, now_covered)
+            chosen.pop()
+
+    for chosen in extend([], 0, 0):
+        times_chosen: Dict[int, int] = defaultdict(int)
+        for index in chosen:
+            times_chosen[index] += 1
+        for combination in product(
+            *(
+                combinations(hand_positions_by_mask[masks[index]], times)
+                for index, times in times_chosen.items()
+            )
+        ):
+            yield tuple(
+                hand_position
+                for hand_positions_in_group in combination
+                for hand_position in hand_positions_in_group
+            )
+
+
+def count_covering_groups(hand_positions: Set[HandPosition], k: int) -> int:
+    # By inclusion-exclusion over the scale degrees a group may be confined to.
+    number_of_hand_positions_within = [0] * (ALL_SCALE_DEGREES_MASK + 1)
+    for hand_position in hand_positions:
+        number_of_hand_positions_within[hand_position.get_scale_degree_mask()] += 1
+    for bit in range(NUMBER_OF_SCALE_DEGREES):
+        for mask in range(ALL_SCALE_DEGREES_MASK + 1):
+            if mask & (1 << bit):
+                number_of_hand_positions_within[
+                    mask
+                ] += number_of_hand_positions_within[mask ^ (1 << bit)]
+
+    return sum(
+        (-1) ** (NUMBER_OF_SCALE_DEGREES - bin(mask).count("1"))
+        * comb(number_of_hand_positions_within[mask], k)
+        for mask in range(ALL_SCALE_DEGREES_MASK + 1)
+    )
+
+
+def work_out_coverable_scale_degrees(
+    masks: List[int], maximum_number_of_masks: int
+) -> List[bytearray]:
+    coverable = []
+    unions = {0}
+    for number_of_masks in range(maximum_number_of_masks + 1):
+        if number_of_masks:
+            unions = {union | mask for union in unions for mask in masks}
+        coverable_with_this_many = bytearray(ALL_SCALE_DEGREES_MASK + 1)
+        for union in unions:
+            coverable_with_this_many[union] = 1
+        for bit in range(NUMBER_OF_SCALE_DEGREES):
+            for mask in range(ALL_SCALE_DEGREES_MASK + 1):
+                if mask & (1 << bit) and coverable_with_this_many[mask]:
+                    coverable_with_this_many[mask ^ (1 << bit)] = 1
+        coverable.append(coverable_with_this_many)
+    return coverable
+
+
+def iter_submasks(mask: int) -> Iterator[int]:
+    submask = mask
+    while True:
+        yield submask
+        if submask == 0:
+            return
+        submask = (submask - 1) & mask
+
+
+def filter_out_solutions_without_the_right_open_strings(
+    solutions: Iterable[PairOfHandPositions],
+    *desired_open_strings: Set[String],
+) -> Iterator[PairOfHandPositions]:
+    for pair in solutions:
+        if pair.get_all_open_strings() in desired_open_strings:
+            yield pair
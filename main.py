@@ -1,54 +1,106 @@
+import argparse
 from collections import defaultdict
-from typing import List
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional, Set
 
 from guitars import (
+    count_successful_pairs,
+    DEFAULT_HAND_POSITION_CACHE_DIRECTORY,
+    DEFAULT_MAXIMUM_HAND_POSITION_CACHE_SIZE_IN_BYTES,
+    DEFAULT_PROGRESS_INTERVAL_IN_SECONDS,
+    filter_hand_positions_reaching_fret,
     filter_out_hand_positions_with_repeated_notes,
-    filter_out_solutions_without_the_right_open_strings,
+    Fret,
     generate_all_hand_positions,
+    generate_all_hand_positions_reaching_new_frets,
+    HandPosition,
+    HandPositionCache,
+    iter_successful_pairs,
     PairOfHandPositions,
+    PairSearchEngine,
+    Progress,
+    Stage,
     String,
-    work_out_successful_pairs_of_hand_positions,
 )
 
 NUMBER_OF_FRETS_TO_CONSIDER = 8
+ALLOWED_OPEN_STRINGS = [
+    {String(i) for i in range(2, 7)},
+    {String(i) for i in range(1, 6)},
+]
 
 
 def main():
-    all_hand_positions = generate_all_hand_positions(NUMBER_OF_FRETS_TO_CONSIDER)
+    arguments = parse_arguments()
+
+    cache = None
+    if not arguments.no_cache:
+        cache = HandPositionCache(
+            arguments.cache_directory, arguments.cache_size * 1024 * 1024
+        )
+
+    all_hand_positions = get_or_generate_hand_positions(
+        cache,
+        "all",
+        NUMBER_OF_FRETS_TO_CONSIDER,
+        lambda: generate_all_hand_positions(
+            NUMBER_OF_FRETS_TO_CONSIDER,
+            progress=display_progress,
+            progress_interval_in_seconds=arguments.progress_interval,
+            number_of_workers=arguments.workers,
+        ),
+        lambda previous_number_of_frets, previous_hand_positions: (
+            previous_hand_positions
+            | generate_all_hand_positions_reaching_new_frets(
+                previous_number_of_frets,
+                NUMBER_OF_FRETS_TO_CONSIDER,
+                progress=display_progress,
+                progress_interval_in_seconds=arguments.progress_interval,
+                number_of_workers=arguments.workers,
+            )
+        ),
+    )
     print(f"Found {len(all_hand_positions)} hand-positions.")
     if not all_hand_positions:
         print("That seems odd. Terminating.")
         return
 
-    hand_positions_with_no_repeated_notes = (
-        filter_out_hand_positions_with_repeated_notes(all_hand_positions)
+    hand_positions_with_no_repeated_notes = get_or_generate_hand_positions(
+        cache,
+        "no repeated notes",
+        NUMBER_OF_FRETS_TO_CONSIDER,
+        lambda: filter_out_hand_positions_with_repeated_notes(all_hand_positions),
+        lambda previous_number_of_frets, previous_hand_positions: (
+            previous_hand_positions
+            | filter_out_hand_positions_with_repeated_notes(
+                filter_hand_positions_reaching_fret(
+                    all_hand_positions, Fret(previous_number_of_frets)
+                )
+            )
+        ),
     )
     print(
         f"Found {len(hand_positions_with_no_repeated_notes)}"
         " hand-positions which lead to no repeated notes."
     )
 
-    solutions = work_out_successful_pairs_of_hand_positions(
-        hand_positions_with_no_repeated_notes
-    )
-
-    solutions_with_five_open_strings_including_bottom_e = (
-        filter_out_solutions_without_the_right_open_strings(
-            solutions,
-            {String(i) for i in range(2, 7)},
-        )
-    )
-
-    solutions_with_five_open_strings_including_top_e = (
-        filter_out_solutions_without_the_right_open_strings(
-            solutions,
-            {String(i) for i in range(1, 6)},
+    if arguments.count_only:
+        counts = count_successful_pairs(
+            hand_positions_with_no_repeated_notes,
+            allowed_open_strings=ALLOWED_OPEN_STRINGS,
         )
-    )
+        print(f"Found {sum(counts.values())} solution-pairs.")
+        for open_strings, count in counts.items():
+            open_string_numbers = sorted(string.number for string in open_strings)
+            print(f"{count} with strings {open_string_numbers} open.")
+        return
 
-    all_good_solutions = (
-        solutions_with_five_open_strings_including_bottom_e
-        + solutions_with_five_open_strings_including_top_e
+    all_good_solutions = iter_successful_pairs(
+        hand_positions_with_no_repeated_notes,
+        engine=PairSearchEngine(arguments.engine),
+        allowed_open_strings=ALLOWED_OPEN_STRINGS,
+        progress=display_progress,
+        progress_interval_in_seconds=arguments.progress_interval,
     )
 
     organised_solutions = organise_pairs_and_order_them(all_good_solutions)
@@ -70,21 +122,104 @@ def main():
 
     print(instances)
 
-    line_number = 0
     with open("solutions.txt", "w") as f:
-        for solution in organised_solutions:
-            line_number += 1
+        for line_number, solution in enumerate(organised_solutions, start=1):
             f.write(f"{line_number} {str(solution)} ({solution.display_frets()})\n")
 
 
+def get_or_generate_hand_positions(
+    cache: Optional[HandPositionCache],
+    name: str,
+    number_of_frets_to_consider: int,
+    generate: Callable[[], Set[HandPosition]],
+    extend: Callable[[int, Set[HandPosition]], Set[HandPosition]],
+) -> Set[HandPosition]:
+    if cache is None:
+        return generate()
+    return cache.get_or_generate(name, number_of_frets_to_consider, generate, extend)
+
+
+def display_progress(progress: Progress) -> None:
+    if progress.examined == 0 and not progress.is_finished:
+        if progress.stage is Stage.SEARCHING_FOR_PAIRS:
+            print(f"Looking through {progress.total:,} pairs...")
+        return
+
+    estimated_seconds_remaining = progress.estimated_seconds_remaining
+    if progress.is_finished or estimated_seconds_remaining is None:
+        time_remaining = f"{progress.elapsed_seconds:.1f}s taken"
+    else:
+        time_remaining = f"about {estimated_seconds_remaining:.0f}s remaining"
+    print(
+        f"{progress.stage.value.capitalize()}: done {progress.examined:,}"
+        f" of {progress.total:,}, found {progress.found:,}"
+        f" ({progress.examined_per_second:,.0f} per second, {time_remaining})"
+    )
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Find pairs of hand-positions which together produce all 12 notes."
+        )
+    )
+    parser.add_argument(
+        "--engine",
+        choices=[engine.value for engine in PairSearchEngine],
+        default=PairSearchEngine.COMPLEMENT_MASK.value,
+        help="how to search for pairs (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--cache-directory",
+        type=Path,
+        default=DEFAULT_HAND_POSITION_CACHE_DIRECTORY,
+        help="where to cache generated hand-positions (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_MAXIMUM_HAND_POSITION_CACHE_SIZE_IN_BYTES // (1024 * 1024),
+        help="megabytes to keep in the cache (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="always generate hand-positions from scratch",
+    )
+    parser.add_argument(
+        "--count-only",
+        action="store_true",
+        help="only count the solution-pairs for each set of open strings",
+    )
+    parser.add_argument(
+        "--progress-interval",
+        type=float,
+        default=DEFAULT_PROGRESS_INTERVAL_IN_SECONDS,
+        help="seconds between progress reports (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help=(
+            "number of processes to generate hand-positions with; the search for"
+            " pairs takes a fraction of the time and always runs on one"
+            " (default: 1)"
+        ),
+    )
+    return parser.parse_args()
+
+
 def organise_pairs_and_order_them(
-    pairs_of_hand_positions: List[PairOfHandPositions],
+    pairs_of_hand_positions: Iterable[PairOfHandPositions],
 ) -> List[PairOfHandPositions]:
     pairs_with_the_lowest_always_first = [
         pair.organise_with_lowest_hand_first() for pair in pairs_of_hand_positions
     ]
 
-    return sorted(pairs_with_the_lowest_always_first)
+    return sorted(
+        pairs_with_the_lowest_always_first, key=PairOfHandPositions.get_sort_key
+    )
 
 
 if __name__ == "__main__":